@@ -3,6 +3,7 @@ To run this script type: 'python cli_print_test.py'
 You must use python3 and have the pandas package installed.
 """
 
+import os
 import re
 import sys
 
@@ -17,13 +18,20 @@ from argparse import (
 import pandas as pd
 
 DATE_REGEX = [
-    '([0-9][0-9]?)([A-Z][a-z]+)([0-9]{2})_([0-9]{4})$',
-    '([0-9][0-9]?)[\-_]([0-9][0-9]?)[\-_]([0-9]{2})[\-_]([0-9]?[0-9]{3})([AP]M)$',
+    r'(?P<day>[0-9][0-9]?)(?P<mon>[A-Z][a-z]+)(?P<year>[0-9]{2})_(?P<time>[0-9]{4})',
+    (r'(?P<month12>[0-9][0-9]?)[\-_](?P<day12>[0-9][0-9]?)[\-_](?P<year12>[0-9]{2})'
+     r'[\-_](?P<time12>[0-9]?[0-9]{3})(?P<meridiem>[AP]M)'),
 ]
 
+_FILE_RE = re.compile(
+    r'(?P<participant>[A-Za-z0-9]+)_(?P<test>.+?)_'
+    rf'(?:{DATE_REGEX[0]}|{DATE_REGEX[1]})'
+    r'(?: \([0-9]+\))?(?:\.txt)?$'
+)
+
 MONTHS = {
     'january': 1,
-    'februray': 2,
+    'february': 2,
     'march': 3,
     'april': 4,
     'may': 5,
@@ -36,6 +44,12 @@ MONTHS = {
     'december': 12,
 }
 
+_MONTH_PREFIX = {
+    name[:i]: number
+    for name, number in MONTHS.items()
+    for i in range(3, len(name) + 1)
+}
+
 KNOWN_TESTS = {
     'AVM_N(1)',
     'AVM_N(2)',
@@ -63,13 +77,8 @@ KNOWN_TESTS = {
     's-WSenComp'
 }
 
-def remove_extension(fname):
-    return re.sub('( \([0-9]+\))?\.txt$', '', fname)
-
 def convert_month(month):
-    for name, number in MONTHS.items():
-        if name.startswith(month):
-            return number
+    return _MONTH_PREFIX[month]
 
 def convert_twelve_hour(time):
     if len(time) == 6:
@@ -81,44 +90,33 @@ def convert_twelve_hour(time):
         minutes = time[1:3]
         meridiem = time[3:]
 
-    if meridiem == 'PM' and hours != '12':
-        hours = str((int(hours) + 12) % 24)
+    if not 1 <= int(hours) <= 12:
+        raise ValueError(f'Invalid 12-hour time: {time}')
 
-    return hours + minutes
+    if meridiem == 'AM' and hours == '12':
+        hours = '0'
+    elif meridiem == 'PM' and hours != '12':
+        hours = str(int(hours) + 12)
 
-def process_filename_time(fname):
-
-    if re.search(DATE_REGEX[0], fname):
-        dmatch = re.search(DATE_REGEX[0], fname)
-        day = dmatch.group(1)
-        month = convert_month(dmatch.group(2).lower())
-        year = '20' + dmatch.group(3)
-        time = dmatch.group(4)
-    elif re.search(DATE_REGEX[1], fname):
-        dmatch = re.search(DATE_REGEX[1], fname)
-        day = dmatch.group(2)
-        month = dmatch.group(1)
-        year = '20' + dmatch.group(3)
-        time = convert_twelve_hour(dmatch.group(4))
-    else:
-        raise Exception(f'Unable to detect time: {fname}')
+    return hours + minutes
 
-    dt = f'{year}-{month}-{day} {time}'
-    dt = datetime.strptime(dt, '%Y-%m-%d %H%M') 
+def process_filename_time(fmatch):
+    """Build the test date and time from a _FILE_RE match."""
 
-    return dmatch.span()[0], dt
+    if fmatch['time'] is not None:
+        day = fmatch['day']
+        month = convert_month(fmatch['mon'].lower())
+        year = fmatch['year']
+        time = fmatch['time']
+    else:
+        day = fmatch['day12']
+        month = int(fmatch['month12'])
+        year = fmatch['year12']
+        time = convert_twelve_hour(fmatch['time12'] + fmatch['meridiem'])
 
-def is_valid_name(fname):
-    """Checks if a file name is valid. The number of underscores confirms validity."""
+    hours, minutes = divmod(int(time), 100)
 
-    if ((re.search(r'[0-9]{4}(\.txt)?$', fname) or
-         re.search(r'[0-9] \([0-9]\)(\.txt)?$', fname) or
-         re.search(r'[0-9]?[0-9]{3}[AP]M(\.txt)?$', fname) or
-         re.search(r'[0-9]?[0-9]{3}[AP]M \([0-9]\)(\.txt)?$', fname)) and
-         fname.count('_') >= 1):
-        return True
-    else:
-        return False
+    return datetime(2000 + int(year), month, int(day), hours, minutes)
 
 def parse_file(fname):
     """
@@ -139,19 +137,23 @@ def parse_file(fname):
         test name
     time: datetime
         test date and time
+
+    None is returned when the file name does not follow the expected syntax
+    or its date is not a real date.
     """
 
-    fname = remove_extension(fname)
-    pmatch = re.match('([A-Za-z0-9]+)_', fname)
-    participant = pmatch.group(1)
-    tbegin = pmatch.span()[1]
-    dbegin, time = process_filename_time(fname)
-    tend = dbegin - 1
-    tname = fname[tbegin:tend]
+    fmatch = _FILE_RE.match(fname)
+    if fmatch is None:
+        return None
+
+    try:
+        time = process_filename_time(fmatch)
+    except (KeyError, ValueError):
+        return None
 
-    return participant, tname, time
+    return fmatch['participant'], fmatch['test'], time
 
-def process_directory(dname):
+def process_directory(dname, participant=None):
     """
     Parse the files within a directory into their respective parts.
 
@@ -160,6 +162,9 @@ def process_directory(dname):
 
     dname: str
         the directory name
+    participant: str, optional
+        only parse the files belonging to this participant; files for other
+        participants are skipped and not reported as invalid
 
     Output
     ------
@@ -170,28 +175,30 @@ def process_directory(dname):
         lists the invalid files
     """
 
-    results = {
-        'file_name': [],
-        'participant': [],
-        'test': [],
-        'date': [],
-    }
-
+    rows = []
     invalid_files = []
     dname = Path(dname).resolve()
-    directory_files = [x.name for x in dname.iterdir() if x.is_file()]
+    prefix = '' if participant is None else f'{participant}_'
+    with os.scandir(dname) as entries:
+        directory_files = [
+            x.name for x in entries if x.name.startswith(prefix) and x.is_file()
+        ]
     for fname in directory_files:
 
-        if is_valid_name(fname):
-            participant, tname, time = parse_file(fname)
-            results['file_name'].append(fname)
-            results['participant'].append(participant)
-            results['test'].append(tname)
-            results['date'].append(time)
-        else:
+        result = parse_file(fname)
+        if result is None:
             invalid_files.append(fname)
+        else:
+            rows.append((fname, *result))
 
-    return pd.DataFrame(results), invalid_files
+    df = pd.DataFrame.from_records(
+        rows, columns=['file_name', 'participant', 'test', 'date']
+    )
+    df['participant'] = df['participant'].astype('category')
+    df['test'] = df['test'].astype('category')
+    df['date'] = pd.to_datetime(df['date'])
+
+    return df, invalid_files
 
 def get_parser():
     """Define parser object"""
@@ -250,6 +257,7 @@ Here are some example usage:
         '--date_range', 
         action='store', 
         nargs=2,
+        type=pd.Timestamp,
         help='display results within this date range'
     )
     
@@ -267,6 +275,14 @@ Here are some example usage:
 
     return parser
 
+def format_timestamp(timestamp):
+    """Format a date range bound, showing the time only when it is not midnight."""
+
+    if timestamp == timestamp.normalize():
+        return f'{timestamp:%Y-%m-%d}'
+
+    return timestamp.isoformat(sep=' ')
+
 def main():
     parser = get_parser()
     args = parser.parse_args()
@@ -276,28 +292,32 @@ def main():
     participant = args.participant
     test = args.test
 
-    df, invalid_files = process_directory(directory)
+    df, invalid_files = process_directory(directory, participant)
+
+    all_test = KNOWN_TESTS.union(df['test'].cat.categories)
 
-    all_test = KNOWN_TESTS.union(set(df['test']))
+    mask = pd.Series(True, index=df.index)
 
     if dates is not None:
-        df = df.loc[df['date'].ge(dates[0]) & df['date'].le(dates[1])]
+        mask &= df['date'].between(dates[0], dates[1])
 
     if participant is not None:
-        df = df.loc[df['participant'].eq(participant)]
+        mask &= df['participant'].eq(participant)
 
-    missing = all_test.difference(df['test'])
+    missing = all_test.difference(df.loc[mask, 'test'].unique())
 
     if test is not None:
-        df = df.loc[df['test'].eq(test)]
+        mask &= df['test'].eq(test)
+
+    df = df.loc[mask]
 
     if dates is not None and participant is not None:
         msg = 'Here are the tests for pariticipant {} between dates {} {}'.format(
-            participant, dates[0], dates[1]
+            participant, format_timestamp(dates[0]), format_timestamp(dates[1])
         )
     elif dates is not None:
         msg = 'Here are all the tests between dates {} {}'.format(
-            dates[0], dates[1]
+            format_timestamp(dates[0]), format_timestamp(dates[1])
         )
     elif participant is not None:
         msg = f'Here are all the tests for participant {participant}'
@@ -306,15 +326,16 @@ def main():
 
     print(f'\n{msg}')
     print_df = df[['file_name', 'participant', 'test', 'date']]
-    print(print_df.sort_values('file_name', ignore_index=True).to_string())
+    print_df = print_df.sort_values(
+        ['participant', 'date', 'file_name'], ignore_index=True
+    )
+    print_df.to_csv(sys.stdout, sep='\t')
 
     print('\nHere are the missing tests:')
-    for one_test in sorted(missing):
-        print(f'\t{one_test}')
+    sys.stdout.write(''.join(f'\t{one_test}\n' for one_test in sorted(missing)))
 
     print(f'\nHere are the invalid files:')
-    for invalid_file in invalid_files:
-        print(f'\t{invalid_file}')
+    sys.stdout.write(''.join(f'\t{invalid_file}\n' for invalid_file in invalid_files))
 
 
 if __name__ == '__main__':